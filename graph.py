@@ -1,14 +1,27 @@
 # graph.py — 열에너지 방출 그래프(제출·공유·관찰) — Cloud 안정판
 # 실행 파일은 반드시 graph.py로 지정하세요.
 
-import json, re, sys, logging, inspect
+import json, re, struct, sys, time, logging, inspect
+import numpy as np
 import pandas as pd
 import altair as alt
 import streamlit as st
+import mysql.connector as mc
+from mysql.connector import errorcode, pooling
+from mysql.connector.errors import PoolError
+try:
+    import orjson
+    _json_loads = orjson.loads
+    def _json_dumps(obj) -> str: return orjson.dumps(obj).decode()
+except ImportError:  # orjson 미설치 시 표준 json
+    _json_loads = json.loads
+    def _json_dumps(obj) -> str: return json.dumps(obj, ensure_ascii=False)
 
 logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 
 ACTIVITY_ID = "2025-heat-curve-01"
+DATA_COLS = ["시간(분)", "온도(°C)"]
+_SID_RE = re.compile(r"\d{5}")
 
 st.set_page_config(page_title="열에너지 방출 그래프 그리기", layout="wide")
 st.markdown("""<style>
@@ -25,12 +38,22 @@ def _stretch_kwargs_for(func):
     if _supports_param(func, "width"): return {"width": "stretch"}
     if _supports_param(func, "use_container_width"): return {"use_container_width": True}
     return {}
+# inspect.signature는 느리므로 프로세스당 한 번만 판별 (스크립트 rerun 간 유지)
+@st.cache_resource(show_spinner=False)
+def _stretch_kwargs(name: str):
+    return _stretch_kwargs_for(getattr(st, name))
+_DE_KW = _stretch_kwargs("data_editor")
+_DF_KW = _stretch_kwargs("dataframe")
+_AC_KW = _stretch_kwargs("altair_chart")
+_VL_KW = _stretch_kwargs("vega_lite_chart")
 def st_data_editor_stretch(*args, **kwargs):
-    f = st.data_editor;   kwargs.update(_stretch_kwargs_for(f)); return f(*args, **kwargs)
+    kwargs.update(_DE_KW); return st.data_editor(*args, **kwargs)
 def st_dataframe_stretch(*args, **kwargs):
-    f = st.dataframe;     kwargs.update(_stretch_kwargs_for(f)); return f(*args, **kwargs)
+    kwargs.update(_DF_KW); return st.dataframe(*args, **kwargs)
 def st_altair_chart_stretch(chart, **kwargs):
-    f = st.altair_chart;  kwargs.update(_stretch_kwargs_for(f)); return f(chart, **kwargs)
+    kwargs.update(_AC_KW); return st.altair_chart(chart, **kwargs)
+def st_vega_lite_chart_stretch(spec, **kwargs):
+    kwargs.update(_VL_KW); return st.vega_lite_chart(spec, **kwargs)
 
 # ---------- DB 설정/상태 (오프라인 안전) ----------
 @st.cache_resource(show_spinner=False)
@@ -43,64 +66,205 @@ def get_db_conf():
         return None
 DB_CONF = get_db_conf()
 
+@st.cache_resource(show_spinner=False)
+def get_pool(conf):
+    """프로세스당 한 번만 커넥션 풀 생성. 이후 요청은 풀에서 빌려 씀."""
+    return pooling.MySQLConnectionPool(
+        pool_name="g1", pool_size=8, pool_reset_session=False,
+        host=conf["host"], port=conf["port"], user=conf["user"],
+        password=conf["password"], database=conf["database"],
+        connection_timeout=5, charset="utf8mb4", autocommit=True)
+
+def _borrow(pool, wait: float=3.0):
+    """풀이 모두 사용 중이면(PoolError) 최대 wait초 동안 0.1초 간격으로 재시도."""
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            return pool.get_connection()
+        except PoolError:
+            if time.monotonic() >= deadline: raise
+            time.sleep(0.1)
+
+@st.cache_resource(ttl=60, show_spinner=False)
 def probe_db(conf):
-    """DB 연결을 한번만 시험. 실패해도 서버는 계속 동작."""
+    """DB 연결 시험. 성공만 1분간 캐시하고, 실패는 예외로 올려 캐시되지 않게 함."""
+    try:
+        conn = _borrow(get_pool(conf), wait=0)
+    except PoolError:  # 풀이 꽉 찬 것은 DB가 바쁜 것이지 꺼진 것이 아님
+        return True
+    try: conn.ping(reconnect=True)
+    finally: conn.close()
+    return True
+
+# 실패한 시험은 잠깐(5초)만 기억 → 장애 중 rerun마다 접속 대기하지 않되 곧 다시 시험
+@st.cache_resource(show_spinner=False)
+def _probe_failure():
+    return {}
+
+def db_status():
+    """성공은 1분, 실패는 5초 동안만 재사용 → rerun마다 연결을 새로 열지 않되 장애에서 곧 복구."""
+    if not DB_CONF:
+        return "OFFLINE: secrets 미설정"
+    fail = _probe_failure()
+    if fail.get("until", 0) > time.monotonic():
+        return f"OFFLINE: {fail['err']}"
     try:
-        import mysql.connector as mc
-        conn = mc.connect(host=conf["host"], port=conf["port"], user=conf["user"],
-                          password=conf["password"], database=conf["database"],
-                          connection_timeout=5, charset="utf8mb4")
-        conn.close()
-        return True, ""
+        probe_db(DB_CONF)
     except Exception as e:
-        return False, str(e)
+        fail.update(until=time.monotonic() + 5, err=str(e))
+        return f"OFFLINE: {e}"
+    return "ONLINE"
+# 상태는 읽을 때마다 db_status()로 조회 (fragment rerun에서도 최신 값, 캐시 적중이라 저렴)
+st.info("DB 상태: " + db_status())
 
-if DB_CONF:
-    _ok, _err = probe_db(DB_CONF)
-    DB_STATUS = "ONLINE" if _ok else f"OFFLINE: { _err }"
-else:
-    DB_STATUS = "OFFLINE: secrets 미설정"
-st.info("DB 상태: " + DB_STATUS)
+# 풀 커넥션은 세션을 유지하므로 prepared cursor도 커넥션별·SQL별로 재사용
+# {실제 커넥션 객체: (서버 connection_id, {sql: cursor})} — connection_id가 바뀌면(재접속) 폐기
+# 키는 비공개 속성 _cnx: 대여마다 새로 만들어지는 PooledMySQLConnection 래퍼로는 풀 안의
+# 실제 커넥션을 구분할 수 없고, 공개 connection_id는 서버 재시작 후 다른 커넥션에 재사용될 수 있음
+@st.cache_resource(show_spinner=False)
+def _prepared_cursors():
+    return {}
 
-def run_sql(sql: str, params=None, fetch: bool=False):
-    if not (DB_CONF and DB_STATUS.startswith("ONLINE")):
+def run_sql(sql: str, params=None, fetch: bool=False, prepared: bool=True):
+    """prepared=False: 문장 텍스트가 매번 달라지는 쿼리(IN 목록 등)는 일반 cursor로 실행."""
+    if not db_status().startswith("ONLINE"):
         return ([], []) if fetch else None
-    import mysql.connector as mc
-    conn = mc.connect(host=DB_CONF["host"], port=DB_CONF["port"], user=DB_CONF["user"],
-                      password=DB_CONF["password"], database=DB_CONF["database"],
-                      connection_timeout=5, charset="utf8mb4")
-    conn.autocommit = True
-    cur = conn.cursor()
-    try:
+    conn = _borrow(get_pool(DB_CONF))
+    prepared = prepared and sql.lstrip()[:6].upper() in ("SELECT", "INSERT")
+    stmts, cur, failed = {}, None, False
+    try:  # 대여 직후부터 try 안에서 처리 → 어떤 예외에도 finally에서 풀로 반납
+        if prepared:
+            cache, cnx = _prepared_cursors(), conn._cnx
+            entry = cache.get(cnx)
+            if entry is None or entry[0] != cnx.connection_id:
+                for old in (entry[1].values() if entry else ()):
+                    try: old.close()
+                    except Exception: pass
+                entry = cache[cnx] = (cnx.connection_id, {})
+            stmts = entry[1]
+            cur = stmts.get(sql)
+        if cur is None:
+            cur = conn.cursor(prepared=prepared)
+            if prepared: stmts[sql] = cur
         cur.execute(sql, params or ())
         if fetch:
             rows = cur.fetchall()
             cols = [d[0] for d in cur.description]
             return rows, cols
+    except Exception:
+        failed = True
+        stmts.pop(sql, None)
+        raise
     finally:
-        try: cur.close(); conn.close()
+        try:
+            if cur is not None and (failed or not prepared):
+                cur.close()  # 실패한 prepared 문장도 서버에서 해제
         except Exception: pass
+        try: conn.close()  # 풀 커넥션 close() → 풀로 반납
+        except Exception: pass
+
+# ---------- 측정값 직렬화 ----------
+# data_blob 형식: 0–60분 고정 격자 float32×61 (little-endian, 측정 안 한 분은 NaN) = 244B
+# (이전 형식 <H 행 수 n> + 시간 int8×n + 온도 float32×n 도 길이로 구분해 읽음)
+GRID_MINUTES = np.arange(61, dtype=np.int8)
+GRID_BYTES = GRID_MINUTES.size * 4
+
+def encode_points(df: pd.DataFrame) -> bytes:
+    grid = np.full(GRID_MINUTES.size, np.nan, "<f4")
+    grid[df["시간(분)"].to_numpy(int)] = df["온도(°C)"].to_numpy(np.float32)
+    return grid.tobytes()
+
+def decode_points(blob, data_json) -> pd.DataFrame:
+    """data_blob 우선, 없으면(이전 제출분) data_json(records 또는 열 단위)으로 복원."""
+    if blob and len(blob) == GRID_BYTES:
+        v = np.frombuffer(blob, "<f4")
+        m = ~np.isnan(v)
+        return pd.DataFrame({"시간(분)": GRID_MINUTES[m], "온도(°C)": v[m]})
+    if blob:
+        n = struct.unpack_from("<H", blob)[0]
+        t = np.frombuffer(blob, np.int8, n, 2)
+        v = np.frombuffer(blob, "<f4", n, 2 + n)
+        return pd.DataFrame({"시간(분)": t, "온도(°C)": v})
+    return pd.DataFrame(_json_loads(data_json), columns=DATA_COLS)
 
 # ---------- 데이터 조회(캐시) ----------
-@st.cache_data(ttl=5, show_spinner=False)
-def load_all(activity_id: str):
-    try:
-        rows, cols = run_sql(
-            """
-            SELECT g1.id, s.name, s.grade, s.class, g1.submitted_at, g1.data_json
-            FROM graph1 g1 JOIN students s ON s.id = g1.id
-            WHERE g1.activity_id=%s
-            ORDER BY g1.id ASC
-            """, (activity_id,), fetch=True
-        )
-        out=[]
-        for r in rows:
-            d=dict(zip(cols,r))
-            d["data"]=pd.DataFrame(json.loads(d["data_json"]))
-            out.append(d)
-        return out, None
-    except Exception as e:
-        return [], str(e)
+# 로더는 cache_resource: 참조로 반환(피클/출력 해시 없음) → 반환된 DataFrame은 읽기 전용.
+# 호출부에서 값을 바꿔야 하면 .assign()/.copy()로 사본을 만들어 쓸 것
+# DB 오류는 캐시하지 않도록 로더 안에서 잡지 않고 그대로 올림 → 호출부에서 경고 표시
+
+# 변경 감지용 마커: 새 제출/재제출이 있을 때만 값이 바뀜 (payload 없이 스칼라 2개)
+@st.cache_data(ttl=10, show_spinner=False)
+def load_version(activity_id: str):
+    rows, _ = run_sql(
+        "SELECT MAX(submitted_at), COUNT(*) FROM graph1 WHERE activity_id=%s",
+        (activity_id,), fetch=True
+    )
+    return tuple(rows[0]) if rows else None
+
+# 대시보드용 목록(메타데이터만) + 학생 1명 데이터 — data_json은 필요한 학생만 조회
+# version 인자는 캐시 키 전용: 마커가 그대로면 DB 재조회 없이 캐시 적중
+@st.cache_resource(ttl=60, show_spinner=False)
+def load_index(activity_id: str, version=None):
+    rows, _ = run_sql(
+        """
+        SELECT g1.id, s.name, s.grade, s.class, g1.submitted_at
+        FROM graph1 g1 JOIN students s ON s.id = g1.id
+        WHERE g1.activity_id=%s
+        ORDER BY g1.id ASC
+        """, (activity_id,), fetch=True
+    )
+    return [{"id": sid, "name": name, "grade": grade, "class": klass, "submitted_at": at}
+            for sid, name, grade, klass, at in rows]
+
+# 학년/반 묶음까지 캐시 안에서 계산 → 대시보드 rerun은 렌더링만
+@st.cache_resource(ttl=60, show_spinner=False)
+def load_grouped(activity_id: str, version=None):
+    groups = {}
+    for d in load_index(activity_id, version):  # index는 id 순 정렬 상태
+        groups.setdefault((d["grade"], d["class"]), []).append(d)
+    return sorted(groups.items())
+
+# version: 해당 학생의 submitted_at → 재제출 전까지 캐시 유효
+@st.cache_resource(ttl=60, show_spinner=False)
+def load_one(activity_id: str, sid: str, version=None):
+    rows, _ = run_sql(
+        "SELECT data_blob, data_json FROM graph1 WHERE activity_id=%s AND id=%s",
+        (activity_id, sid), fetch=True
+    )
+    return decode_points(*rows[0]) if rows else None
+
+# 대시보드 facet용: 반 학생 전체 측정값을 쿼리 한 번으로 조회해 label 붙여 이어 붙임
+# members = ((id, name, submitted_at), ...) → 반에서 누가 재제출하면 키가 바뀜
+@st.cache_resource(ttl=60, show_spinner=False)
+def load_class_points(activity_id: str, members: tuple):
+    marks = ",".join(["%s"] * len(members))
+    rows, _ = run_sql(
+        f"SELECT id, data_blob, data_json FROM graph1 WHERE activity_id=%s AND id IN ({marks})",
+        (activity_id, *(m[0] for m in members)), fetch=True,
+        prepared=False  # 반 인원마다 SQL 텍스트가 달라 prepared 캐시에 쌓이지 않게 함
+    )
+    by_id = {sid: (blob, js) for sid, blob, js in rows}
+    frames = [decode_points(*by_id[sid]).assign(label=f"{sid} {name}")
+              for sid, name, _ in members if sid in by_id]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+def clear_caches():
+    load_version.clear(); load_index.clear(); load_grouped.clear(); load_one.clear()
+    probe_db.clear(); _probe_failure().clear()
+    load_class_points.clear()
+
+# CSV는 학생이 다시 제출(submitted_at 변경)할 때만 새로 생성. _df는 해시 대상에서 제외
+@st.cache_data(ttl=60, show_spinner=False)
+def _csv_bytes(activity_id: str, sid: str, data_version, _df: pd.DataFrame) -> bytes:
+    return _df.to_csv(index=False).encode("utf-8-sig")
+
+# 제출 미리보기: 입력값이 같으면 Altair 조립/직렬화 없이 캐시된 spec 재사용
+@st.cache_data(max_entries=256, show_spinner=False)
+def _preview_spec(points: tuple, sid: str) -> dict:
+    prev = pd.DataFrame(list(points), columns=DATA_COLS)
+    return alt.Chart(prev).mark_line(point=True).encode(
+        x=alt.X("시간(분):Q"), y=alt.Y("온도(°C):Q")
+    ).properties(title=f"학번 {sid}", height=280).to_dict()
 
 # ---------- 탭 ----------
 tab_submit, tab_dash, tab_detail = st.tabs(["📤 제출(학생)", "📊 대시보드", "🔎 학생 상세"])
@@ -121,93 +285,121 @@ with tab_submit:
 
         prev = df.dropna()
         if not prev.empty:
-            chart = alt.Chart(prev.sort_values("시간(분)")).mark_line(point=True).encode(
-                x=alt.X("시간(분):Q"), y=alt.Y("온도(°C):Q")
-            ).properties(title=f"학번 {sid.strip() if sid else ''}", height=280)
-            st_altair_chart_stretch(chart)
+            points = tuple(map(tuple, prev.sort_values("시간(분)")[DATA_COLS].to_numpy().tolist()))
+            st_vega_lite_chart_stretch(_preview_spec(points, sid.strip() if sid else ""))
 
         if st.form_submit_button("제출"):
-            if not re.fullmatch(r"\d{5}", sid or ""):
+            if not _SID_RE.fullmatch(sid or ""):
                 st.error("학번은 숫자 5자리여야 합니다. 예: 10130"); st.stop()
             if df.isnull().any().any():
                 st.error("빈 칸이 있습니다. 모든 셀을 숫자로 입력하세요."); st.stop()
-            if not ((df["시간(분)"].between(0,60)).all() and (df["온도(°C)"].between(-20,150)).all()):
+            t = df["시간(분)"].to_numpy(); v = df["온도(°C)"].to_numpy()
+            if not (((t >= 0) & (t <= 60)).all() and ((v >= -20) & (v <= 150)).all()):
                 st.error("허용 범위를 벗어난 값이 있습니다."); st.stop()
+            # data_blob은 분 단위 격자라 정수·중복 없는 시간만 그대로 저장됨
+            if not (t == np.floor(t)).all():
+                st.error("시간(분)은 정수로 입력하세요."); st.stop()
+            if np.unique(t).size != t.size:
+                st.error("같은 시간(분)이 두 번 이상 입력되었습니다."); st.stop()
 
-            if not DB_STATUS.startswith("ONLINE"):
+            status = db_status()
+            if not DB_CONF:
                 st.error("DB가 설정되지 않아 저장할 수 없습니다. Cloud Secrets를 확인하세요.")
+            elif not status.startswith("ONLINE"):
+                st.error(f"DB에 연결할 수 없습니다. 잠시 후 다시 제출하세요. ({status})")
             else:
-                ok_stu, _ = run_sql("SELECT 1 FROM students WHERE id=%s", (sid,), fetch=True)
-                if not ok_stu:
-                    st.error("해당 학번이 students 테이블에 없습니다. (교사용: 먼저 students에 등록)")
-                else:
-                    ordered = df.sort_values("시간(분)")
-                    payload = json.dumps(ordered.to_dict(orient="records"), ensure_ascii=False)
-                    try:
-                        run_sql(
-                            """
-                            INSERT INTO graph1(activity_id, id, data_json)
-                            VALUES (%s, %s, %s)
-                            ON DUPLICATE KEY UPDATE data_json=VALUES(data_json),
-                                                    submitted_at=CURRENT_TIMESTAMP
-                            """,
-                            (ACTIVITY_ID, sid, payload)
-                        )
-                        load_all.clear()
-                        st.success("제출 완료! ‘📊 대시보드’에서 전체 결과를 확인하세요.")
-                    except Exception as e:
+                # students 존재 확인은 FK(graph1.id → students.id)에 맡겨 INSERT 한 번으로 처리
+                ordered = df.sort_values("시간(분)")
+                # 열 단위 {"시간(분)": [...], "온도(°C)": [...]} — 행마다 키 반복 없음
+                payload = _json_dumps(ordered.to_dict(orient="list"))
+                blob = encode_points(ordered)
+                try:
+                    run_sql(
+                        """
+                        INSERT INTO graph1(activity_id, id, data_json, data_blob)
+                        VALUES (%s, %s, %s, %s)
+                        ON DUPLICATE KEY UPDATE data_json=VALUES(data_json),
+                                                data_blob=VALUES(data_blob),
+                                                submitted_at=CURRENT_TIMESTAMP
+                        """,
+                        (ACTIVITY_ID, sid, payload, blob)
+                    )
+                    # 같은 초 안의 재제출은 마커(MAX(submitted_at), COUNT)를 바꾸지 못하므로
+                    # 목록 캐시도 비움. 측정값 캐시는 학생별 submitted_at 키라 그대로 둠
+                    load_version.clear(); load_index.clear(); load_grouped.clear()
+                    st.success("제출 완료! ‘📊 대시보드’에서 전체 결과를 확인하세요.")
+                except mc.IntegrityError as e:
+                    if e.errno == errorcode.ER_NO_REFERENCED_ROW_2:  # 1452: FK 위반
+                        st.error("해당 학번이 students 테이블에 없습니다. (교사용: 먼저 students에 등록)")
+                    else:
                         st.error(f"[DB오류] 저장 실패: {e}")
+                except Exception as e:
+                    st.error(f"[DB오류] 저장 실패: {e}")
 
-# 대시보드
-with tab_dash:
-    auto = st.toggle("자동 새로고침(10초)", value=True)
-    if auto:
+# 대시보드 — 자동 새로고침은 이 fragment만 다시 실행 (제출/상세 탭은 그대로)
+def render_dashboard():
+    status = db_status()
+    if DB_CONF and not status.startswith("ONLINE"):
+        st.warning(f"[DB 상태] {status}"); return
+    groups = []
+    if DB_CONF:
         try:
-            from streamlit_autorefresh import st_autorefresh
-            st_autorefresh(interval=10_000, key="dash_autorefresh")
-        except Exception:
-            st.info("자동 새로고침 패키지 미설치. (requirements.txt에 streamlit-autorefresh 포함)")
-
-    st.button("🔄 수동 새로고침", on_click=load_all.clear)
-    data, err = load_all(ACTIVITY_ID) if DB_STATUS.startswith("ONLINE") else ([], None)
-    if err: st.warning(f"[조회 경고] {err}")
+            groups = load_grouped(ACTIVITY_ID, load_version(ACTIVITY_ID))
+        except Exception as e:
+            st.warning(f"[조회 경고] {e}"); return
 
-    if not data:
+    if not groups:
         st.info("아직 제출된 데이터가 없습니다.")
-    else:
-        df_all = pd.DataFrame(
-            [{"id":d["id"],"name":d["name"],"grade":d["grade"],"class":d["class"],
-              "submitted_at":d["submitted_at"],"data":d["data"]} for d in data]
-        ).sort_values("id")
-
-        for (g, c), gdf in df_all.groupby(["grade","class"]):
-            st.subheader(f"{g}학년 {c:02d}반")
-            cols = st.columns(3)
-            for i, row in enumerate(gdf.itertuples(index=False)):
-                with cols[i % 3]:
-                    st.markdown(f"**학번 {row.id}** — {row.name}")
-                    ch = alt.Chart(row.data).mark_line(point=True).encode(
-                        x=alt.X("시간(분):Q"), y=alt.Y("온도(°C):Q")
-                    ).properties(height=220, title=f"{row.id}")
-                    st_altair_chart_stretch(ch)
+        return
+    for (g, c), members in groups:
+        st.subheader(f"{g}학년 {c:02d}반")
+        # 반 전체를 한 개의 facet 차트로 → Vega-Lite spec 1개만 전송
+        try:
+            big = load_class_points(
+                ACTIVITY_ID, tuple((d["id"], d["name"], d["submitted_at"]) for d in members))
+        except Exception as e:
+            st.warning(f"[조회 경고] {e}"); continue
+        if big is None: continue
+        ch = alt.Chart(big).mark_line(point=True).encode(
+            x=alt.X("시간(분):Q"), y=alt.Y("온도(°C):Q")
+        ).properties(height=220, width=220).facet(
+            facet=alt.Facet("label:N", title=None), columns=3
+        )
+        st_altair_chart_stretch(ch)
+
+with tab_dash:
+    auto = st.toggle("자동 새로고침(10초)", value=True)
+    st.button("🔄 수동 새로고침", on_click=clear_caches)
+    st.fragment(run_every=10 if auto else None)(render_dashboard)()
 
 # 학생 상세
 with tab_detail:
-    data, _ = load_all(ACTIVITY_ID) if DB_STATUS.startswith("ONLINE") else ([], None)
-    opts = [f'{d["id"]} | {d["name"]}' for d in data]
+    # 선택지는 메타데이터만, 측정값은 선택된 학생 1명만 조회
+    index = []
+    if db_status().startswith("ONLINE"):
+        try:
+            index = load_index(ACTIVITY_ID, load_version(ACTIVITY_ID))
+        except Exception as e:
+            st.warning(f"[조회 경고] {e}")
+    opts = [f'{d["id"]} | {d["name"]}' for d in index]
     sel = st.selectbox("학생 선택", opts, index=0 if opts else None)
     if sel:
         tid = sel.split("|")[0].strip()
-        tgt = next(d for d in data if d["id"] == tid)
+        tgt = next(d for d in index if d["id"] == tid)
+        try:
+            tgt_data = load_one(ACTIVITY_ID, tid, tgt["submitted_at"])
+        except Exception as e:
+            tgt_data = None; st.warning(f"[조회 경고] {e}")
         st.markdown(f"### 학번 {tgt['id']} — {tgt['name']}")
-        big = alt.Chart(tgt["data"]).mark_line(point=True).encode(
-            x=alt.X("시간(분):Q"), y=alt.Y("온도(°C):Q")
-        ).properties(height=420, title=f"{tgt['id']}")
-        st_altair_chart_stretch(big)
-        st_dataframe_stretch(tgt["data"])
-        st.download_button(
-            "⬇️ CSV 다운로드",
-            data=tgt["data"].to_csv(index=False).encode("utf-8-sig"),
-            file_name=f"{ACTIVITY_ID}_{tgt['id']}.csv",
-            mime="text/csv",
-        )
+        if tgt_data is not None:
+            big = alt.Chart(tgt_data).mark_line(point=True).encode(
+                x=alt.X("시간(분):Q"), y=alt.Y("온도(°C):Q")
+            ).properties(height=420, title=f"{tgt['id']}")
+            st_altair_chart_stretch(big)
+            st_dataframe_stretch(tgt_data)
+            st.download_button(
+                "⬇️ CSV 다운로드",
+                data=_csv_bytes(ACTIVITY_ID, tid, tgt["submitted_at"], tgt_data),
+                file_name=f"{ACTIVITY_ID}_{tgt['id']}.csv",
+                mime="text/csv",
+            )
@@ -0,0 +1,13 @@
+-- graph.py가 기대하는 스키마 변경 사항 (MySQL 8). 순서대로 한 번만 실행.
+
+-- 제출 시 students 존재 확인을 FK에 맡김 (INSERT 실패 시 errno 1452)
+ALTER TABLE graph1
+  ADD CONSTRAINT fk_graph1_student FOREIGN KEY (id) REFERENCES students(id);
+
+-- 측정값 바이너리 저장 (graph.py encode_points 형식). data_json은 이전 제출분 호환용으로 유지
+ALTER TABLE graph1
+  ADD COLUMN data_blob VARBINARY(1024) NULL AFTER data_json;
+
+-- load_index / load_version: WHERE activity_id=? ORDER BY id 를 정렬 없이 인덱스만으로 처리
+-- (submitted_at 포함 → data_json/data_blob 행을 읽지 않음. students(id)는 PK 전제)
+CREATE INDEX ix_g1_cover ON graph1(activity_id, id, submitted_at);